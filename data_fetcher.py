@@ -1,10 +1,264 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 import yfinance as yf
+import streamlit as st
 from datetime import datetime, timedelta
 import os
 
+# orjson decodes the FMP payloads noticeably faster; fall back to the stdlib
+# decoder (which also accepts raw bytes) when it isn't installed.
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+
+_FMP_BASE_URL = "https://financialmodelingprep.com/api/v3"
+
+# FMP API keys that returned 401/403 during this process
+_rejected_fmp_keys = set()
+
+# Column dtypes of the historical OHLC frames returned by both sources;
+# float32 is plenty of precision for share prices and halves the memory.
+_OHLCV_DTYPES = {
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.float64
+}
+
+
+def _fmp_get(session, path, api_key, params=None):
+    """
+    Shared GET for Financial Modeling Prep endpoints.
+    
+    Args:
+        session (requests.Session): Pooled session to send the request with
+        path (str): Endpoint path relative to the v3 API root
+        api_key (str): FMP API key
+        params (dict): Additional query parameters
+        
+    Returns:
+        dict or list: Decoded JSON payload, or None if the request failed
+        
+    Raises:
+        RuntimeError: If FMP rejects the API key (HTTP 401/403)
+    """
+    response = session.get(f"{_FMP_BASE_URL}/{path}", params={**(params or {}), 'apikey': api_key}, timeout=(2, 5))
+    if response.status_code in (401, 403):
+        # Remember the rejected key so later calls go straight to Yahoo Finance
+        _rejected_fmp_keys.add(api_key)
+        raise RuntimeError(f"FMP rejected the API key (status {response.status_code})")
+    if response.status_code != 200:
+        return None
+    return _json_loads(response.content)
+
+
+# Quotes and news go stale quickly, historical OHLC barely changes within the hour.
+# The cached functions only return plain dicts/lists/DataFrames so Streamlit can
+# pickle them; the API key is part of the cache key together with the symbol.
+# The leading underscore keeps the HTTP session out of the cache key.
+# Failures are raised rather than returned: Streamlit does not cache exceptions,
+# so the DataFetcher methods catch them and the next call retries.
+@st.cache_data(ttl=10, max_entries=128, show_spinner=False)
+def _fetch_real_time(symbol, fmp_api_key, _session):
+    """Cached implementation of DataFetcher.fetch_real_time_data."""
+    # Try Financial Modeling Prep first
+    if fmp_api_key and fmp_api_key not in _rejected_fmp_keys:
+        try:
+            data = _fmp_get(_session, f"quote/{symbol}", fmp_api_key)
+            
+            if data and len(data) > 0:
+                stock_data = data[0]
+                return {
+                    'name': stock_data.get('name', ''),
+                    'price': stock_data.get('price', 0.0),
+                    'price_change_percentage': stock_data.get('changesPercentage', 0.0),
+                    'previous_close': stock_data.get('previousClose', 0.0)
+                }
+        except Exception as e:
+            print(f"Error fetching from FMP API: {e}")
+    
+    # Fallback to Yahoo Finance
+    try:
+        ticker = yf.Ticker(symbol)
+        info = ticker.info
+        
+        # Calculate price change percentage from the quote fields, no price history needed
+        current_price = info.get('currentPrice', info.get('regularMarketPrice', 0.0))
+        previous_close = info.get('previousClose', 0.0)
+        
+        if current_price and previous_close:
+            price_change_percentage = ((current_price - previous_close) / previous_close) * 100
+        else:
+            price_change_percentage = 0.0
+        
+        return {
+            'name': info.get('shortName', ''),
+            'price': current_price,
+            'price_change_percentage': price_change_percentage,
+            'previous_close': previous_close
+        }
+    except Exception as e:
+        raise RuntimeError(f"Error fetching from Yahoo Finance: {e}") from e
+
+
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def _fetch_historical(symbol, days, fmp_api_key, _session):
+    """Cached implementation of DataFetcher.fetch_historical_data."""
+    # Try Financial Modeling Prep first if API key is available
+    if fmp_api_key and fmp_api_key not in _rejected_fmp_keys:
+        try:
+            # Calculate the start date
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=days+5)).strftime('%Y-%m-%d')  # Add buffer days
+            
+            data = _fmp_get(_session, f"historical-price-full/{symbol}", fmp_api_key,
+                            params={'from': start_date, 'to': end_date})
+            
+            if data and 'historical' in data and len(data['historical']) > 0:
+                historical = data['historical']
+                
+                # Build the columns directly with known dtypes instead of letting
+                # pandas infer them from the list of dicts
+                dates = np.array([row['date'] for row in historical], dtype='datetime64[D]')
+                columns = {
+                    column: np.fromiter((row[column] for row in historical), dtype=dtype, count=len(historical))
+                    for column, dtype in _OHLCV_DTYPES.items()
+                }
+                df = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='date'))
+                
+                # FMP returns the newest day first: reverse instead of sorting (newest last)
+                if len(df) > 1 and dates[0] > dates[-1]:
+                    df = df.iloc[::-1]
+                
+                # Limit to the requested number of days
+                if len(df) > days:
+                    df = df.iloc[-days:]
+                    
+                return df
+        except Exception as e:
+            print(f"Error fetching historical data from FMP API: {e}")
+    
+    # Fallback to Yahoo Finance
+    try:
+        # Calculate the start date (add buffer days)
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days+5)  # Add buffer days for weekends and holidays
+        
+        # Fetch data from Yahoo Finance
+        ticker = yf.Ticker(symbol)
+        df = ticker.history(start=start_date, end=end_date)
+        
+        df = _normalize_yahoo_history(df, days)
+    except Exception as e:
+        raise RuntimeError(f"Error fetching historical data from Yahoo Finance: {e}") from e
+    
+    if df.empty:
+        raise RuntimeError(f"No historical data available for {symbol}")
+    return df
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _fetch_historical_batch(symbols, days):
+    """Cached implementation of DataFetcher.fetch_historical_data_batch."""
+    try:
+        # Calculate the start date (add buffer days)
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days+5)  # Add buffer days for weekends and holidays
+        
+        # One Yahoo Finance request for all the symbols
+        bulk = yf.download(
+            list(symbols),
+            start=start_date,
+            end=end_date,
+            group_by='ticker',
+            threads=True,
+            progress=False
+        )
+        
+        downloaded = set(bulk.columns.get_level_values(0))
+        histories = {}
+        for symbol in symbols:
+            if symbol not in downloaded:
+                continue
+            # Tickers that failed inside the download come back as all-NaN columns
+            df = bulk[symbol].dropna(how='all')
+            if not df.empty:
+                histories[symbol] = _normalize_yahoo_history(df, days)
+        return histories
+    except Exception as e:
+        raise RuntimeError(f"Error fetching batched historical data from Yahoo Finance: {e}") from e
+
+
+def _normalize_yahoo_history(df, days):
+    """
+    Convert a Yahoo Finance OHLCV frame to the format used by the analyzers.
+    
+    Args:
+        df (pandas.DataFrame): Yahoo Finance frame with capitalized OHLCV columns
+        days (int): Number of most recent days to keep
+        
+    Returns:
+        pandas.DataFrame: DataFrame with lower-case OHLCV columns
+    """
+    # Process the DataFrame
+    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+    df.columns = df.columns.str.lower()
+    df = df.astype(_OHLCV_DTYPES)
+    
+    # Limit to the requested number of days
+    if len(df) > days:
+        df = df.iloc[-days:]
+        
+    return df
+
+
+@st.cache_data(ttl=60, max_entries=128, show_spinner=False)
+def _fetch_news(symbol, limit):
+    """Cached implementation of DataFetcher.fetch_news."""
+    try:
+        # Use Yahoo Finance API for news, which is more widely available
+        ticker = yf.Ticker(symbol)
+        news_list = []
+        
+        # Get news from Yahoo Finance
+        news_data = ticker.news
+        
+        if news_data:
+            for article in news_data[:limit]:  # Limit number of articles
+                # Format date
+                if 'providerPublishTime' in article:
+                    published_date = datetime.fromtimestamp(article['providerPublishTime'])
+                    formatted_date = published_date.strftime('%Y-%m-%d')
+                else:
+                    formatted_date = "N/A"
+                
+                # Truncate long summaries once here so the cached result is ready to render
+                summary = article.get('summary', '') or 'No summary available'
+                if len(summary) > 500:
+                    summary = summary[:500] + "..."
+                
+                news_list.append({
+                    'title': article.get('title', 'No title available'),
+                    'date': formatted_date,
+                    'url': article.get('link', '#'),
+                    'source': article.get('publisher', 'Yahoo Finance'),
+                    'text': summary
+                })
+            
+            return news_list
+        
+        return []
+        
+    except Exception as e:
+        raise RuntimeError(f"Error fetching news data: {str(e)}") from e
+
+
 class DataFetcher:
     """
     Class responsible for fetching stock data from various sources
@@ -16,65 +270,39 @@ class DataFetcher:
         # Get the API key from environment variables
         self.fmp_api_key = os.getenv("FMP_API_KEY", "")
         
+        # Shared session so consecutive FMP calls reuse the same keep-alive connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self.session.mount("https://", adapter)
+        
     def fetch_real_time_data(self, symbol):
         """
         Fetch real-time stock data using FMP API with Yahoo Finance as fallback.
         
+        Results are cached for 10 seconds per symbol.
+        
         Args:
             symbol (str): Stock symbol to fetch data for
             
         Returns:
             dict: Dictionary containing real-time stock data
         """
-        # Try Financial Modeling Prep first
-        if self.fmp_api_key:
-            try:
-                url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={self.fmp_api_key}"
-                response = requests.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    if data and len(data) > 0:
-                        stock_data = data[0]
-                        return {
-                            'name': stock_data.get('name', ''),
-                            'price': stock_data.get('price', 0.0),
-                            'price_change_percentage': stock_data.get('changesPercentage', 0.0),
-                            'previous_close': stock_data.get('previousClose', 0.0)
-                        }
-            except Exception as e:
-                print(f"Error fetching from FMP API: {e}")
-        
-        # Fallback to Yahoo Finance
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            price_history = ticker.history(period="2d")
-            
-            # Calculate price change percentage
-            current_price = info.get('currentPrice', info.get('regularMarketPrice', 0.0))
-            previous_close = info.get('previousClose', 0.0)
-            
-            if current_price and previous_close:
-                price_change_percentage = ((current_price - previous_close) / previous_close) * 100
-            else:
-                price_change_percentage = 0.0
-            
-            return {
-                'name': info.get('shortName', ''),
-                'price': current_price,
-                'price_change_percentage': price_change_percentage,
-                'previous_close': previous_close
-            }
+            return _fetch_real_time(symbol, self.fmp_api_key, self.session)
         except Exception as e:
-            print(f"Error fetching from Yahoo Finance: {e}")
+            print(e)
             return None
             
     def fetch_historical_data(self, symbol, days=30):
         """
         Fetch historical OHLC data for the specified symbol.
         
+        Results are cached for one hour per (symbol, days).
+        
         Args:
             symbol (str): Stock symbol to fetch data for
             days (int): Number of days of historical data to retrieve
@@ -82,75 +310,38 @@ class DataFetcher:
         Returns:
             pandas.DataFrame: DataFrame with historical OHLC data
         """
-        # Try Financial Modeling Prep first if API key is available
-        if self.fmp_api_key:
-            try:
-                # Calculate the start date
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=days+5)).strftime('%Y-%m-%d')  # Add buffer days
-                
-                url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?from={start_date}&to={end_date}&apikey={self.fmp_api_key}"
-                response = requests.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    if 'historical' in data and len(data['historical']) > 0:
-                        # Convert to DataFrame
-                        df = pd.DataFrame(data['historical'])
-                        
-                        # Rename columns to match expected format
-                        df = df.rename(columns={
-                            'date': 'date',
-                            'open': 'open',
-                            'high': 'high',
-                            'low': 'low',
-                            'close': 'close',
-                            'volume': 'volume'
-                        })
-                        
-                        # Convert date to datetime and set as index
-                        df['date'] = pd.to_datetime(df['date'])
-                        df = df.set_index('date')
-                        
-                        # Sort by date (newest last)
-                        df = df.sort_index()
-                        
-                        # Limit to the requested number of days
-                        if len(df) > days:
-                            df = df.iloc[-days:]
-                            
-                        return df
-            except Exception as e:
-                print(f"Error fetching historical data from FMP API: {e}")
-        
-        # Fallback to Yahoo Finance
         try:
-            # Calculate the start date (add buffer days)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days+5)  # Add buffer days for weekends and holidays
-            
-            # Fetch data from Yahoo Finance
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(start=start_date, end=end_date)
+            return _fetch_historical(symbol, days, self.fmp_api_key, self.session)
+        except Exception as e:
+            print(e)
+            return pd.DataFrame()
             
-            # Process the DataFrame
-            df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
-            df.columns = df.columns.str.lower()
+    def fetch_historical_data_batch(self, symbols, days=30):
+        """
+        Fetch historical OHLC data for several symbols with a single Yahoo Finance request.
+        
+        Results are cached for one hour per (symbols, days).
+        
+        Args:
+            symbols (list): Stock symbols to fetch data for
+            days (int): Number of days of historical data to retrieve
             
-            # Limit to the requested number of days
-            if len(df) > days:
-                df = df.iloc[-days:]
-                
-            return df
+        Returns:
+            dict: Dictionary with symbols as keys and historical OHLC DataFrames as values;
+            symbols that could not be downloaded are omitted
+        """
+        try:
+            return _fetch_historical_batch(tuple(symbols), days)
         except Exception as e:
-            print(f"Error fetching historical data from Yahoo Finance: {e}")
-            return pd.DataFrame()
+            print(e)
+            return {}
             
     def fetch_news(self, symbol, limit=5):
         """
         Fetch latest news for the specified stock symbol.
         
+        Results are cached for 60 seconds per (symbol, limit).
+        
         Args:
             symbol (str): Stock symbol to fetch news for
             limit (int): Maximum number of news items to retrieve
@@ -159,34 +350,7 @@ class DataFetcher:
             list: List of news articles with title, date, and URL
         """
         try:
-            # Use Yahoo Finance API for news, which is more widely available
-            ticker = yf.Ticker(symbol)
-            news_list = []
-            
-            # Get news from Yahoo Finance
-            news_data = ticker.news
-            
-            if news_data:
-                for article in news_data[:limit]:  # Limit number of articles
-                    # Format date
-                    if 'providerPublishTime' in article:
-                        published_date = datetime.fromtimestamp(article['providerPublishTime'])
-                        formatted_date = published_date.strftime('%Y-%m-%d')
-                    else:
-                        formatted_date = "N/A"
-                    
-                    news_list.append({
-                        'title': article.get('title', 'No title available'),
-                        'date': formatted_date,
-                        'url': article.get('link', '#'),
-                        'source': article.get('publisher', 'Yahoo Finance'),
-                        'text': article.get('summary', 'No summary available')
-                    })
-                
-                return news_list
-            
-            return []
-            
+            return _fetch_news(symbol, limit)
         except Exception as e:
-            print(f"Error fetching news data: {str(e)}")
+            print(e)
             return []
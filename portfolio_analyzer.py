@@ -2,11 +2,181 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import csv
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
 import io
+import json
+import re
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from data_fetcher import DataFetcher
 from stock_analyzer import StockAnalyzer
 
+# Prefer the C-based lxml parser when it is installed; html.parser is the pure-Python fallback
+_HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+# Next.js pages embed their data as JSON in this script tag
+_NEXT_DATA_RE = re.compile(r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+
+# CSS class of the eToro portfolio asset links, matched as one token of the class attribute
+_ASSET_CELL_CLASS_RE = re.compile(r'(?:^|\s)user-portfolio-card-table-asset-cell(?:\s|$)')
+
+# Only the eToro portfolio asset links are turned into tree nodes when parsing the HTML page
+_ASSET_LINKS = SoupStrainer('a', class_=_ASSET_CELL_CLASS_RE)
+
+# Keys that may hold the ticker of an eToro position in the embedded JSON
+_POSITION_SYMBOL_KEYS = ('symbol', 'symbolFull', 'ticker', 'instrumentSymbol')
+
+# Common column names in various portfolio exports
+_SYMBOL_COLUMNS = ['symbol', 'ticker', 'stock', 'asset', 'instrument', 'security', 'position id']
+_QUANTITY_COLUMNS = ['units', 'amount', 'quantity', 'shares', 'position units', 'holdings', 'position']
+
+# Valid portfolio symbol: 1-10 characters, the first two of which are not digits
+_SYMBOL_RE = re.compile(r'^\D(?:\D.{0,8})?$')
+
+# Rows read per chunk when streaming portfolio CSV files
+_CSV_CHUNK_SIZE = 50_000
+
+
+def _find_positions(node):
+    """
+    Find the first list stored under a 'positions' key in a decoded JSON tree.
+    
+    Args:
+        node: Decoded JSON value
+        
+    Returns:
+        list: The positions list, or None if there is none
+    """
+    if isinstance(node, dict):
+        positions = node.get('positions')
+        if isinstance(positions, list):
+            return positions
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    
+    for child in children:
+        positions = _find_positions(child)
+        if positions is not None:
+            return positions
+    return None
+
+
+def _portfolio_from_next_data(html):
+    """
+    Extract an eToro portfolio from the __NEXT_DATA__ JSON embedded in the page.
+    
+    Args:
+        html (str): Page content
+        
+    Returns:
+        dict: Dictionary with stock symbols as keys and their position data as values,
+        or None if the page has no usable JSON data (e.g. the schema changed)
+    """
+    match = _NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    
+    try:
+        positions = _find_positions(json.loads(match.group(1)))
+    except ValueError:
+        return None
+    if not positions:
+        return None
+    
+    portfolio = {}
+    for position in positions:
+        if not isinstance(position, dict):
+            continue
+        symbol = next((position[key] for key in _POSITION_SYMBOL_KEYS if position.get(key)), None)
+        if not isinstance(symbol, str) or not symbol.strip():
+            continue
+        portfolio[symbol.strip().upper()] = {
+            'quantity': 1.0,
+            'position_type': 'Short' if position.get('isBuy') is False else 'Long'
+        }
+    return portfolio or None
+
+
+def _locate_portfolio_columns(headers):
+    """
+    Find the symbol and quantity columns among normalized CSV headers.
+    
+    Args:
+        headers (list): Lower-cased, stripped header names
+        
+    Returns:
+        tuple: (symbol column index, quantity column index)
+    """
+    # Try to find exact matches first, then partial matches, then default positions.
+    # A partial match never reuses the column already picked for the other field
+    # (e.g. 'position id' also contains 'position').
+    symbol_col = next((i for i, h in enumerate(headers) if h in _SYMBOL_COLUMNS), None)
+    quantity_col = next((i for i, h in enumerate(headers) if h in _QUANTITY_COLUMNS), None)
+    
+    if symbol_col is None:
+        symbol_col = next((i for i, h in enumerate(headers)
+                           if i != quantity_col and any(col in h for col in _SYMBOL_COLUMNS)), 0)
+    if quantity_col is None:
+        quantity_col = next((i for i, h in enumerate(headers)
+                             if i != symbol_col and any(col in h for col in _QUANTITY_COLUMNS)), 1)
+    
+    # Never read symbols and quantities from the same column
+    if symbol_col == quantity_col:
+        quantity_col = 1 if symbol_col == 0 else 0
+    
+    return symbol_col, quantity_col
+
+
+def _aggregate_positions(symbols, quantities):
+    """
+    Clean raw symbol/quantity columns and sum the quantities per symbol.
+    
+    Args:
+        symbols (pandas.Series): Raw symbol cells
+        quantities (pandas.Series): Raw quantity cells
+        
+    Returns:
+        pandas.Series: Total quantity indexed by cleaned symbol
+    """
+    # Clean the cells and handle merged cells
+    symbols = symbols.astype('string').str.strip().str.strip('"').str.split(',').str[0].str.strip().str.upper()
+    
+    # Replace common eToro suffixes with standard ticker symbols, preserving crypto symbols
+    symbols = symbols.str.split('.').str[0]
+    symbols = symbols.where(symbols.str.endswith('-USD', na=False), symbols.str.split('-').str[0])
+    
+    # Convert quantities to float, defaulting to 1 where not possible
+    # (to_numeric returns a nullable Int64/Float64 series for string input: back to plain floats)
+    quantities = pd.to_numeric(quantities.astype('string').str.replace(',', ''), errors='coerce')
+    quantities = quantities.astype('float64').fillna(1.0)
+    
+    # Skip empty rows and purely numeric symbols
+    valid = symbols.str.contains(r'\D', na=False)
+    return quantities[valid].groupby(symbols[valid], sort=False).sum()
+
+
+def _filter_valid_symbols(positions):
+    """
+    Drop non-standard symbols from aggregated positions.
+    
+    Args:
+        positions (pandas.Series): Quantities indexed by symbol
+        
+    Returns:
+        dict: Dictionary with the valid stock symbols as keys and their quantities as values
+    """
+    # Basic validation: symbols are typically 1-5 letters (sometimes with a suffix)
+    symbols = positions.index.to_series(index=positions.index).astype('string')
+    valid = symbols.str.match(_SYMBOL_RE, na=False)
+    return positions[valid].to_dict()
+
+
 class PortfolioAnalyzer:
     """
     Class for analyzing a portfolio of stocks, calculating aggregate metrics,
@@ -23,6 +193,14 @@ class PortfolioAnalyzer:
         self.portfolio_data = portfolio_data if portfolio_data else {}
         self.stock_analyzers = {}
         self.portfolio_summary = None
+        self._stocks_df = None
+        
+        # Shared session so repeated eToro requests reuse the same keep-alive connection
+        self._http = requests.Session()
+        self._http.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        self._http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
         
     def parse_etoro_portfolio(self, etoro_url):
         """
@@ -39,10 +217,7 @@ class PortfolioAnalyzer:
             if not etoro_url.startswith("https://www.etoro.com/people/"):
                 return None, "L'URL deve iniziare con 'https://www.etoro.com/people/'"
                 
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(etoro_url, headers=headers, timeout=10)
+            response = self._http.get(etoro_url, timeout=10)
             
             if response.status_code == 404:
                 return None, "Portfolio non trovato. Verifica che l'URL sia corretto."
@@ -51,11 +226,17 @@ class PortfolioAnalyzer:
             elif response.status_code != 200:
                 return None, f"Errore nel caricamento (Status code: {response.status_code})"
                 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Fast path: read the positions from the page's embedded JSON data, without building a DOM
+            portfolio = _portfolio_from_next_data(response.text)
+            if portfolio:
+                return portfolio
+            
+            # Only build tree nodes for the portfolio asset links, the rest of the page is skipped while parsing
+            soup = BeautifulSoup(response.content, _HTML_PARSER, parse_only=_ASSET_LINKS)
             portfolio = {}
             
             # Look for portfolio elements in the page
-            portfolio_elements = soup.find_all('a', class_='user-portfolio-card-table-asset-cell')
+            portfolio_elements = soup.find_all('a', class_=_ASSET_CELL_CLASS_RE)
             
             # Extract stock data
             for element in portfolio_elements:
@@ -85,8 +266,6 @@ class PortfolioAnalyzer:
         Returns:
             dict: Dictionary with stock symbols as keys and their quantities as values
         """
-        portfolio = {}
-        
         # Use StringIO to parse the CSV content
         f = io.StringIO(csv_content)
         
@@ -97,79 +276,21 @@ class PortfolioAnalyzer:
             headers = [h.split(',')[0] if ',' in h else h for h in headers]  # Handle merged cells
             
             # Find columns for symbol and quantity/units
-            symbol_col = None
-            quantity_col = None
-            
-            # Common column names in various portfolio exports
-            possible_symbol_cols = ['symbol', 'ticker', 'stock', 'asset', 'instrument', 'security', 'position id']
-            possible_quantity_cols = ['units', 'amount', 'quantity', 'shares', 'position units', 'holdings', 'position']
-
-            # Try to find exact matches first
-            symbol_col = next((i for i, h in enumerate(headers) if h in possible_symbol_cols), None)
-            quantity_col = next((i for i, h in enumerate(headers) if h in possible_quantity_cols), None)
-
-            # If not found, try partial matches
-            if symbol_col is None:
-                symbol_col = next((i for i, h in enumerate(headers) if any(col in h for col in possible_symbol_cols)), 0)
-            if quantity_col is None:
-                quantity_col = next((i for i, h in enumerate(headers) if any(col in h for col in possible_quantity_cols)), 1)
+            symbol_col, quantity_col = _locate_portfolio_columns(headers)
             
-            for i, header in enumerate(headers):
-                if any(possible_symbol in header for possible_symbol in possible_symbol_cols):
-                    symbol_col = i
-                if any(possible_quantity in header for possible_quantity in possible_quantity_cols):
-                    quantity_col = i
+            # Read the portfolio data; ragged rows are padded with None, so rows too short
+            # to hold both columns have no value in the right-most one
+            rows = pd.DataFrame.from_records(list(reader))
+            last_col = max(symbol_col, quantity_col)
+            if rows.shape[1] <= last_col:
+                return {}
+            rows = rows[rows[last_col].notna()]
             
-            # If we couldn't identify the columns, use default positions
-            if symbol_col is None:
-                symbol_col = 0  # Assume first column is symbol
-            if quantity_col is None:
-                quantity_col = 1  # Assume second column is quantity
-            
-            # Read the portfolio data
-            for row in reader:
-                if len(row) > max(symbol_col, quantity_col):
-                    # Clean the row data and handle merged cells
-                    cleaned_row = [cell.strip().strip('"') for cell in row]
-                    cleaned_row = [cell.split(',')[0] if ',' in cell else cell for cell in cleaned_row]
-                    
-                    if not cleaned_row[symbol_col]:  # Skip empty rows
-                        continue
-                        
-                    symbol = cleaned_row[symbol_col].strip().upper()
-                    
-                    # Clean up the symbol to ensure compatibility
-                    # Replace common eToro suffixes with standard ticker symbols
-                    if '.' in symbol:
-                        symbol = symbol.split('.')[0]
-                    if '-' in symbol and not symbol.endswith('-USD'):  # Preserve crypto symbols
-                        symbol = symbol.split('-')[0]
-                    
-                    # Try to convert quantity to float, default to 1 if not possible
-                    try:
-                        quantity = float(row[quantity_col].replace(',', ''))
-                    except (ValueError, TypeError):
-                        quantity = 1
-                    
-                    # Only add if the symbol seems valid
-                    # Check for position type (Long/Short)
-                    position_type = 'Long'  # Default to Long
-                    if len(cleaned_row) > 5:  # If we have a position column
-                        position = cleaned_row[5].strip().upper()
-                        position_type = 'Short' if 'SHORT' in position else 'Long'
-                    
-                    if symbol and len(symbol) > 0 and not symbol.isdigit():
-                        if symbol in portfolio:
-                            portfolio[symbol] += quantity
-                        else:
-                            portfolio[symbol] = quantity
+            # Clean symbols and quantities column-wise and sum them per symbol
+            portfolio = _aggregate_positions(rows[symbol_col], rows[quantity_col])
             
             # Remove any potential non-standard symbols
-            cleaned_portfolio = {}
-            for symbol, quantity in portfolio.items():
-                # Basic validation: symbols are typically 1-5 letters (sometimes with a suffix)
-                if 1 <= len(symbol) <= 10 and not any(c.isdigit() for c in symbol[:2]):
-                    cleaned_portfolio[symbol] = quantity
+            cleaned_portfolio = _filter_valid_symbols(portfolio)
             
             return cleaned_portfolio
             
@@ -177,6 +298,50 @@ class PortfolioAnalyzer:
             print(f"Error parsing eToro CSV: {str(e)}")
             return {}
     
+    def parse_portfolio_csv_file(self, path_or_buf):
+        """
+        Parse a portfolio CSV file in chunks, without loading it in memory at once.
+        
+        Like parse_portfolio_csv, rows without a quantity cell are skipped; unlike it,
+        rows with an empty quantity cell are skipped too, and malformed lines are ignored.
+        
+        Args:
+            path_or_buf (str or file-like): Path of the CSV file or an open file object
+            
+        Returns:
+            dict: Dictionary with stock symbols as keys and their quantities as values
+        """
+        try:
+            # Read only the header row to locate the symbol and quantity columns
+            columns = pd.read_csv(path_or_buf, nrows=0).columns
+            headers = [str(h).strip().lower().strip('"').split(',')[0] for h in columns]  # Handle merged cells
+            symbol_col, quantity_col = _locate_portfolio_columns(headers)
+            symbol_name, quantity_name = columns[symbol_col], columns[quantity_col]
+            
+            if hasattr(path_or_buf, 'seek'):
+                path_or_buf.seek(0)
+            
+            # Stream the two columns we need and aggregate quantities chunk by chunk
+            totals = pd.Series(dtype='float64', index=pd.Index([], dtype='string'))
+            chunks = pd.read_csv(
+                path_or_buf,
+                usecols=[symbol_col, quantity_col],
+                dtype='string',
+                keep_default_na=False,
+                na_values=[''],
+                on_bad_lines='skip',
+                chunksize=_CSV_CHUNK_SIZE
+            )
+            for chunk in chunks:
+                chunk = chunk[chunk[quantity_name].notna()]
+                totals = totals.add(_aggregate_positions(chunk[symbol_name], chunk[quantity_name]), fill_value=0)
+            
+            return _filter_valid_symbols(totals)
+            
+        except Exception as e:
+            print(f"Error parsing portfolio CSV file: {str(e)}")
+            return {}
+    
     def load_portfolio(self, portfolio_data):
         """
         Load a portfolio for analysis.
@@ -200,10 +365,16 @@ class PortfolioAnalyzer:
         if not self.portfolio_data:
             return None
             
+        # Fetch the historical data of all the stocks with one batched request
+        historical_data = DataFetcher().fetch_historical_data_batch(list(self.portfolio_data))
+        
         # Initialize analyzers for each stock in the portfolio
         for symbol in self.portfolio_data.keys():
             try:
-                self.stock_analyzers[symbol] = StockAnalyzer(symbol)
+                if symbol in historical_data:
+                    self.stock_analyzers[symbol] = StockAnalyzer.from_frame(symbol, historical_data[symbol])
+                else:
+                    self.stock_analyzers[symbol] = StockAnalyzer(symbol)
             except Exception as e:
                 print(f"Error initializing analyzer for {symbol}: {str(e)}")
         
@@ -213,70 +384,36 @@ class PortfolioAnalyzer:
         total_prediction = 0
         portfolio_trends = {"upward": 0, "downward": 0, "sideways": 0, "unknown": 0}
         
-        for symbol, quantity in self.portfolio_data.items():
-            if symbol in self.stock_analyzers:
-                analyzer = self.stock_analyzers[symbol]
-                
-                try:
-                    # Get real-time data
-                    real_time_data = analyzer.get_real_time_data()
-                    
-                    if real_time_data:
-                        current_price = real_time_data['price']
-                        quantity = portfolio_data[symbol]['quantity']
-                        position_type = portfolio_data[symbol]['position_type']
-                        
-                        # Per le posizioni short, il profitto è inverso
-                        current_value = current_price * quantity
-                        if position_type == 'Short':
-                            current_value = -current_value  # Il valore è negativo per gli short
-                        
-                        total_value += abs(current_value)  # Usiamo il valore assoluto per il totale
-                        
-                        # Get trend analysis
-                        trend_data = analyzer.get_trend_analysis(days=prediction_days)
-                        portfolio_trends[trend_data['trend_direction']] += 1
-                        
-                        # Get predictive data
-                        predictive_data = analyzer.get_predictive_data(days=prediction_days)
-                        if predictive_data and len(predictive_data['prices']) > 0:
-                            final_predicted_price = predictive_data['prices'][-1]
-                            predicted_value = final_predicted_price * quantity
-                            total_prediction += predicted_value
-                            
-                            # Calculate percentage change
-                            predicted_change = ((final_predicted_price - current_price) / current_price) * 100
-                        else:
-                            final_predicted_price = current_price
-                            predicted_value = current_value
-                            predicted_change = 0
-                            
-                        # Store the analysis
-                        stock_analysis[symbol] = {
-                            'name': real_time_data.get('name', symbol),
-                            'quantity': quantity,
-                            'current_price': current_price,
-                            'current_value': current_value,
-                            'predicted_price': final_predicted_price,
-                            'predicted_value': predicted_value,
-                            'predicted_change': predicted_change,
-                            'trend': trend_data['trend_direction'],
-                            'trend_strength': trend_data['strength'],
-                            'rsi': trend_data['momentum_indicators']['rsi']
-                        }
-                except Exception as e:
-                    print(f"Error analyzing {symbol}: {str(e)}")
+        # Analyze the stocks concurrently: each one waits on network fetches.
+        # Worker threads get the script context so the cached fetchers can run outside the main thread.
+        symbols = [symbol for symbol in self.portfolio_data if symbol in self.stock_analyzers]
+        if symbols:
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(max_workers=min(16, len(symbols)), initializer=add_script_run_ctx,
+                                    initargs=(None, ctx)) as executor:
+                results = list(executor.map(lambda symbol: self._analyze_one(symbol, prediction_days), symbols))
+        else:
+            results = []
+        
+        # Aggregate the per-stock results
+        for symbol, result in zip(symbols, results):
+            if result is None:
+                continue
+            analysis, abs_value, predicted_value = result
+            stock_analysis[symbol] = analysis
+            total_value += abs_value  # Usiamo il valore assoluto per il totale
+            total_prediction += predicted_value
+            portfolio_trends[analysis['trend']] += 1
         
         # Calculate portfolio-level metrics
         portfolio_prediction_change = ((total_prediction - total_value) / total_value) * 100 if total_value > 0 else 0
         
-        # Determine overall portfolio trend
-        if portfolio_trends["upward"] > portfolio_trends["downward"] + portfolio_trends["sideways"]:
-            overall_trend = "upward"
-        elif portfolio_trends["downward"] > portfolio_trends["upward"] + portfolio_trends["sideways"]:
-            overall_trend = "downward"
-        else:
-            overall_trend = "sideways"
+        # Determine overall portfolio trend: the most common direction if it holds
+        # a strict majority of the known trends, sideways otherwise
+        trend_names = ("upward", "sideways", "downward")
+        trend_counts = np.array([portfolio_trends[trend] for trend in trend_names])
+        leading = int(trend_counts.argmax())
+        overall_trend = trend_names[leading] if 2 * trend_counts[leading] > trend_counts.sum() else "sideways"
             
         # Calculate the percentage of stocks in each trend
         total_stocks = sum(portfolio_trends.values())
@@ -295,8 +432,100 @@ class PortfolioAnalyzer:
             'stocks': stock_analysis
         }
         
+        # Build the per-stock table once; the composition/performance getters only select and sort it
+        self._stocks_df = pd.DataFrame.from_records(
+            [
+                {
+                    'Symbol': symbol,
+                    'Name': analysis['name'],
+                    'Current Value': analysis['current_value'],
+                    'Current Price': analysis['current_price'],
+                    'Predicted Price': analysis['predicted_price'],
+                    'Predicted Change %': analysis['predicted_change'],
+                    'Trend': analysis['trend'],
+                    'RSI': analysis['rsi']
+                }
+                for symbol, analysis in stock_analysis.items()
+            ],
+            columns=['Symbol', 'Name', 'Current Value', 'Current Price', 'Predicted Price',
+                     'Predicted Change %', 'Trend', 'RSI']
+        )
+        self._stocks_df['Percentage'] = (self._stocks_df['Current Value'] / total_value) * 100
+        
         return self.portfolio_summary
     
+    def _analyze_one(self, symbol, prediction_days):
+        """
+        Analyze a single stock of the portfolio.
+        
+        Args:
+            symbol (str): Stock symbol to analyze
+            prediction_days (int): Number of days to predict
+            
+        Returns:
+            tuple: (analysis dict, absolute current value, predicted value to add to
+            the portfolio total) or None if the stock could not be analyzed
+        """
+        analyzer = self.stock_analyzers[symbol]
+        
+        try:
+            # Get real-time data
+            real_time_data = analyzer.get_real_time_data()
+            
+            if not real_time_data:
+                return None
+            
+            current_price = real_time_data.price
+            # Bind the position once; plain numbers are treated as long quantities
+            position = self.portfolio_data[symbol]
+            if isinstance(position, dict):
+                quantity = position['quantity']
+                position_type = position.get('position_type', 'Long')
+            else:
+                quantity = position
+                position_type = 'Long'
+            
+            # Per le posizioni short, il profitto è inverso
+            abs_value = current_price * abs(quantity)
+            current_value = -abs_value if position_type == 'Short' else abs_value  # Il valore è negativo per gli short
+            
+            # Get trend analysis
+            trend_data = analyzer.get_trend_analysis(days=prediction_days)
+            momentum = trend_data['momentum_indicators']
+            
+            # Get predictive data
+            predictive_data = analyzer.get_predictive_data(days=prediction_days)
+            if predictive_data and len(predictive_data['prices']) > 0:
+                final_predicted_price = predictive_data['prices'][-1]
+                predicted_value = final_predicted_price * quantity
+                prediction_contribution = predicted_value
+                
+                # Calculate percentage change
+                predicted_change = ((final_predicted_price - current_price) / current_price) * 100
+            else:
+                final_predicted_price = current_price
+                predicted_value = current_value
+                prediction_contribution = 0
+                predicted_change = 0
+                
+            # Store the analysis
+            analysis = {
+                'name': real_time_data.name or symbol,
+                'quantity': quantity,
+                'current_price': current_price,
+                'current_value': current_value,
+                'predicted_price': final_predicted_price,
+                'predicted_value': predicted_value,
+                'predicted_change': predicted_change,
+                'trend': trend_data['trend_direction'],
+                'trend_strength': trend_data['strength'],
+                'rsi': momentum['rsi']
+            }
+            return analysis, abs_value, prediction_contribution
+        except Exception as e:
+            print(f"Error analyzing {symbol}: {str(e)}")
+            return None
+    
     def get_portfolio_composition(self):
         """
         Get the composition of the portfolio for visualization.
@@ -307,17 +536,8 @@ class PortfolioAnalyzer:
         if not self.portfolio_summary:
             return pd.DataFrame()
             
-        # Create a DataFrame with portfolio composition data
-        data = []
-        for symbol, analysis in self.portfolio_summary['stocks'].items():
-            data.append({
-                'Symbol': symbol,
-                'Name': analysis['name'],
-                'Current Value': analysis['current_value'],
-                'Percentage': (analysis['current_value'] / self.portfolio_summary['total_value']) * 100
-            })
-            
-        df = pd.DataFrame(data)
+        # Select the portfolio composition data
+        df = self._stocks_df[['Symbol', 'Name', 'Current Value', 'Percentage']]
         return df.sort_values('Current Value', ascending=False)
     
     def get_trend_distribution(self):
@@ -351,18 +571,6 @@ class PortfolioAnalyzer:
         if not self.portfolio_summary:
             return pd.DataFrame()
             
-        # Create a DataFrame with stock performance data
-        data = []
-        for symbol, analysis in self.portfolio_summary['stocks'].items():
-            data.append({
-                'Symbol': symbol,
-                'Name': analysis['name'],
-                'Current Price': analysis['current_price'],
-                'Predicted Price': analysis['predicted_price'],
-                'Predicted Change %': analysis['predicted_change'],
-                'Trend': analysis['trend'],
-                'RSI': analysis['rsi']
-            })
-            
-        df = pd.DataFrame(data)
+        # Select the stock performance data
+        df = self._stocks_df[['Symbol', 'Name', 'Current Price', 'Predicted Price', 'Predicted Change %', 'Trend', 'RSI']]
         return df.sort_values('Predicted Change %', ascending=False)
\ No newline at end of file
@@ -1,23 +1,181 @@
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+
+@dataclass(frozen=True)
+class HistStats:
+    """
+    Statistics of a historical OHLC frame shared by trend analysis and predictions.
+    
+    Attributes:
+        closes (numpy.ndarray): Closing prices, oldest first
+        close_diff (numpy.ndarray): Day-over-day closing price changes
+        returns (numpy.ndarray): Day-over-day closing price returns
+        mean_return (float): Mean daily return
+        volatility (float): Sample standard deviation of the daily returns
+        mean_high_low_ratio (float): Mean high-low range relative to the close
+        mean_open_close_diff (float): Mean gap between the open and the previous close
+    """
+    closes: np.ndarray
+    close_diff: np.ndarray
+    returns: np.ndarray
+    mean_return: float
+    volatility: float
+    mean_high_low_ratio: float
+    mean_open_close_diff: float
+    
+    @classmethod
+    def from_frame(cls, historical_data):
+        """
+        Compute the statistics of a historical OHLC frame in one pass over its columns.
+        
+        Args:
+            historical_data (pandas.DataFrame): Historical OHLC data
+            
+        Returns:
+            HistStats: Statistics of the frame
+        """
+        closes = historical_data['close'].to_numpy(dtype=np.float64)
+        opens = historical_data['open'].to_numpy(dtype=np.float64)
+        highs = historical_data['high'].to_numpy(dtype=np.float64)
+        lows = historical_data['low'].to_numpy(dtype=np.float64)
+        
+        close_diff = np.diff(closes)
+        returns = close_diff / closes[:-1]
+        
+        # nan-aware reductions match the pandas mean()/std() the model used before
+        return cls(
+            closes=closes,
+            close_diff=close_diff,
+            returns=returns,
+            mean_return=float(np.nanmean(returns)),
+            volatility=float(np.nanstd(returns, ddof=1)),
+            mean_high_low_ratio=float(np.nanmean((highs - lows) / closes)),
+            mean_open_close_diff=float(np.nanmean((opens[1:] - closes[:-1]) / closes[:-1]))
+        )
+
+
+def _simple_rsi(diff):
+    """
+    Simple (non-smoothed) RSI over a whole window of price changes.
+    
+    Args:
+        diff (numpy.ndarray): Day-over-day closing price changes, oldest first
+        
+    Returns:
+        float: RSI value between 0 and 100
+    """
+    gains = np.where(diff > 0, diff, 0).sum()
+    losses = np.where(diff < 0, -diff, 0).sum()
+    
+    if losses == 0:
+        return 100
+    rs = gains / losses
+    return 100 - (100 / (1 + rs))
+
+
+def _slope(values):
+    """
+    Least-squares slope of a series against its position (0, 1, 2, ...).
+    
+    Closed-form equivalent of ``np.polyfit(np.arange(n), values, 1)[0]``.
+    
+    Args:
+        values (numpy.ndarray): Series values, oldest first
+        
+    Returns:
+        float: Slope per step, 0 for fewer than two values
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    x = np.arange(n)
+    x_sum = n * (n - 1) / 2
+    xx_sum = (n - 1) * n * (2 * n - 1) / 6
+    return (n * np.dot(x, values) - x_sum * values.sum()) / (n * xx_sum - x_sum ** 2)
+
+
+def _last_ema(values, span):
+    """
+    Last value of the exponential moving average of a series.
+    
+    Matches pandas' ``Series.ewm(span=span).mean().iloc[-1]`` (adjusted weights)
+    without building the intermediate EMA series.
+    
+    Args:
+        values (numpy.ndarray): Series values, oldest first
+        span (int): EMA span
+        
+    Returns:
+        float: EMA at the last observation
+    """
+    alpha = 2 / (span + 1)
+    weights = (1 - alpha) ** np.arange(len(values) - 1, -1, -1)
+    return np.dot(weights, values) / weights.sum()
+
+
+def _simulate_ohlc(current_price, mean_return, volatility, mean_open_close_diff, mean_high_low_ratio,
+                   return_noise, open_noise, range_noise):
+    """
+    Simulate future OHLC prices from historical statistics and pre-drawn random factors.
+    
+    Pure-NumPy core of PredictiveModel.generate_predictions: it only takes floats and
+    arrays, so it has no pandas or random-state dependencies.
+    
+    Args:
+        current_price (float): Current stock price
+        mean_return (float): Mean daily return
+        volatility (float): Standard deviation of the daily returns
+        mean_open_close_diff (float): Mean gap between the open and the previous close
+        mean_high_low_ratio (float): Mean high-low range relative to the close
+        return_noise (numpy.ndarray): Standard normal draws for the daily returns
+        open_noise (numpy.ndarray): Standard normal draws for the opening gaps
+        range_noise (numpy.ndarray): Uniform [0, 1) draws for the daily ranges
+        
+    Returns:
+        tuple: Arrays of closes, daily returns, opens, highs and lows
+    """
+    # Compound the daily returns onto the current price
+    daily_returns = mean_return + (return_noise * volatility)
+    closes = current_price * np.cumprod(1 + daily_returns)
+    previous_closes = np.concatenate(([current_price], closes[:-1]))
+    
+    # Calculate open prices based on previous close
+    opens = previous_closes * (1 + mean_open_close_diff + open_noise * (volatility / 2))
+    
+    # Calculate high and low prices
+    price_range = closes * mean_high_low_ratio * (0.8 + 0.4 * range_noise)
+    highs = np.maximum(closes, opens) + (price_range / 2)
+    lows = np.minimum(closes, opens) - (price_range / 2)
+    
+    return closes, daily_returns, opens, highs, lows
+
+
 class PredictiveModel:
     """
     Class for generating predictive stock price models based on historical data.
     """
     
-    def __init__(self):
-        """Initialize the PredictiveModel."""
-        pass
+    def __init__(self, seed=None):
+        """
+        Initialize the PredictiveModel.
+        
+        Args:
+            seed (int): Optional seed for reproducible predictions (e.g. backtests)
+        """
+        # One random Generator per model, used for all the prediction draws
+        self._rng = np.random.default_rng(seed)
     
-    def analyze_trend(self, historical_data, prediction_data):
+    def analyze_trend(self, historical_data, prediction_data, stats=None):
         """
         Analyze the trend of the stock based on historical and predicted data.
         
         Args:
             historical_data (pandas.DataFrame): Historical OHLC data
             prediction_data (dict): Predicted price data
+            stats (HistStats): Precomputed statistics of historical_data, computed here if omitted
             
         Returns:
             dict: Dictionary containing trend analysis results including:
@@ -36,19 +194,17 @@ class PredictiveModel:
                 'momentum_indicators': {'rsi': 50, 'macd': 0}
             }
             
+        if stats is None:
+            stats = HistStats.from_frame(historical_data)
+            
         # Get recent closing prices
-        recent_closes = historical_data['close'].tail(20).values
+        closes = stats.closes
+        recent_closes = closes[-20:]
         predicted_closes = np.array(prediction_data['prices'])
         
         # Calculate overall trend direction based on linear regression
-        x_hist = np.arange(len(recent_closes))
-        x_pred = np.arange(len(predicted_closes))
-        
-        # Historical slope
-        hist_slope, _ = np.polyfit(x_hist, recent_closes, 1)
-        
         # Predicted slope
-        pred_slope, _ = np.polyfit(x_pred, predicted_closes, 1)
+        pred_slope = _slope(predicted_closes)
         
         # Determine trend direction
         if pred_slope > 0.001:
@@ -60,7 +216,8 @@ class PredictiveModel:
             
         # Calculate trend strength (0-100)
         # Normalize based on historical volatility
-        hist_volatility = np.std(historical_data['close'].pct_change().dropna())
+        close_diff = stats.close_diff
+        hist_volatility = np.std(stats.returns)
         norm_pred_slope = abs(pred_slope) / (hist_volatility * 10)  # Normalize to 0-1 range
         strength = min(100, max(0, norm_pred_slope * 100))  # Convert to 0-100
         
@@ -69,20 +226,16 @@ class PredictiveModel:
         resistance_level = max(np.max(recent_closes), np.max(predicted_closes)) * 1.02
         
         # Calculate basic momentum indicators
-        # Simple RSI calculation
-        diff = np.diff(np.append(recent_closes, predicted_closes))
-        gains = np.sum(diff[diff > 0])
-        losses = abs(np.sum(diff[diff < 0]))
-        
-        if losses == 0:
-            rsi = 100
-        else:
-            rs = gains / losses
-            rsi = 100 - (100 / (1 + rs))
+        # RSI over the recent and predicted closes, reusing the historical price changes
+        rsi_diff = np.concatenate((
+            close_diff[len(closes) - len(recent_closes):],
+            np.diff(np.append(recent_closes[-1], predicted_closes))
+        ))
+        rsi = _simple_rsi(rsi_diff)
             
         # Simple MACD calculation (difference between fast and slow EMA)
-        ema12 = historical_data['close'].ewm(span=12).mean().iloc[-1]
-        ema26 = historical_data['close'].ewm(span=26).mean().iloc[-1]
+        ema12 = _last_ema(closes, span=12)
+        ema26 = _last_ema(closes, span=26)
         macd = ema12 - ema26
         
         return {
@@ -96,7 +249,7 @@ class PredictiveModel:
             }
         }
     
-    def generate_predictions(self, historical_data, current_price, days=5):
+    def generate_predictions(self, historical_data, current_price, days=5, stats=None):
         """
         Generate predictive stock prices for the specified number of days.
         
@@ -104,6 +257,7 @@ class PredictiveModel:
             historical_data (pandas.DataFrame): Historical OHLC data
             current_price (float): Current stock price
             days (int): Number of days to predict
+            stats (HistStats): Precomputed statistics of historical_data, computed here if omitted
             
         Returns:
             dict: Dictionary containing predicted prices and percentage changes
@@ -117,55 +271,28 @@ class PredictiveModel:
                 'low_prices': []
             }
         
-        # Calculate daily returns and volatility from historical data
-        historical_returns = historical_data['close'].pct_change().dropna()
-        mean_return = historical_returns.mean()
-        volatility = historical_returns.std()
-        
-        # Calculate high-low spread ratio for the historical data
-        high_low_ratio = (historical_data['high'] - historical_data['low']) / historical_data['close']
-        mean_high_low_ratio = high_low_ratio.mean()
-        
-        # Calculate open-close relationship
-        open_close_diff = (historical_data['open'] - historical_data['close'].shift(1)) / historical_data['close'].shift(1)
-        mean_open_close_diff = open_close_diff.dropna().mean()
+        # Daily returns, volatility, high-low spread and open-close gap of the historical data
+        if stats is None:
+            stats = HistStats.from_frame(historical_data)
         
         # Generate future prices with a bit of randomness but based on historical patterns
-        predicted_prices = []
-        predicted_percentage_changes = []
-        predicted_open_prices = []
-        predicted_high_prices = []
-        predicted_low_prices = []
-        
-        last_price = current_price
-        
-        for _ in range(days):
-            # Add some randomness to the daily return but keep it within a realistic range
-            random_factor = np.random.normal(0, 1)
-            daily_return = mean_return + (random_factor * volatility)
-            
-            # Calculate percentage change for the day
-            percentage_change = daily_return * 100
-            predicted_percentage_changes.append(percentage_change)
-            
-            # Calculate new price
-            new_price = last_price * (1 + daily_return)
-            predicted_prices.append(new_price)
-            
-            # Calculate open price based on previous close
-            open_price = last_price * (1 + mean_open_close_diff + np.random.normal(0, volatility/2))
-            predicted_open_prices.append(open_price)
-            
-            # Calculate high and low prices
-            price_range = new_price * mean_high_low_ratio * (0.8 + 0.4 * np.random.random())
-            high_price = max(new_price, open_price) + (price_range / 2)
-            low_price = min(new_price, open_price) - (price_range / 2)
-            
-            predicted_high_prices.append(high_price)
-            predicted_low_prices.append(low_price)
-            
-            # Update last price for next iteration
-            last_price = new_price
+        rng = self._rng
+        closes, daily_returns, opens, highs, lows = _simulate_ohlc(
+            float(current_price),
+            stats.mean_return,
+            stats.volatility,
+            stats.mean_open_close_diff,
+            stats.mean_high_low_ratio,
+            rng.standard_normal(days),
+            rng.standard_normal(days),
+            rng.random(days)
+        )
+        
+        predicted_prices = closes.tolist()
+        predicted_percentage_changes = (daily_returns * 100).tolist()
+        predicted_open_prices = opens.tolist()
+        predicted_high_prices = highs.tolist()
+        predicted_low_prices = lows.tolist()
         
         return {
             'prices': predicted_prices,
@@ -1,10 +1,65 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import time
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 from data_fetcher import DataFetcher
-from predictive_model import PredictiveModel
+from predictive_model import PredictiveModel, HistStats
+
+class Quote(NamedTuple):
+    """Real-time quote of a stock."""
+    name: str
+    price: float
+    price_change_percentage: float
+    previous_close: float
+
+
+# Seconds a real-time quote is reused before it is requested again. The request goes
+# through DataFetcher's process-wide quote cache (same ttl), which other analyzers may
+# have filled earlier, so a quote can be up to about twice this old
+_REAL_TIME_TTL = 10.0
+
+# Seconds historical data is reused before it is fetched again
+_HISTORICAL_TTL = 300.0
+
+# dtype of the price columns of the combined frame; six significant digits are plenty for prices
+_PRICE_DTYPE = np.float32
+_PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# Row labels of the combined frame, stored as int8 category codes
+_TYPE_DTYPE = pd.CategoricalDtype(categories=['historical', 'predictive'])
+
+
+def _with_datetime_index(historical_data):
+    """
+    Make sure a historical OHLC frame is indexed by a DatetimeIndex.
+    
+    Args:
+        historical_data (pandas.DataFrame): Historical OHLC data
+        
+    Returns:
+        pandas.DataFrame: The same frame, with its index converted if needed
+    """
+    if historical_data is not None and not isinstance(historical_data.index, pd.DatetimeIndex):
+        historical_data.index = pd.to_datetime(historical_data.index)
+    return historical_data
+
+
+def _history_signature(historical_data):
+    """
+    Cheap signature of the most recent closes of a historical OHLC frame.
+    
+    Args:
+        historical_data (pandas.DataFrame): Historical OHLC data
+        
+    Returns:
+        int: Hash of the last 10 closing prices
+    """
+    return hash(np.ascontiguousarray(historical_data['close'].to_numpy()[-10:]).tobytes())
+
 
 class StockAnalyzer:
     """
@@ -20,38 +75,133 @@ class StockAnalyzer:
             symbol (str): The stock symbol to analyze (e.g., 'AAPL')
         """
         self.symbol = symbol.upper()
-        self.data_fetcher = DataFetcher()
-        self.predictive_model = PredictiveModel()
+        
+        # Crypto and certain other assets also trade on weekends
+        self._is_24_7 = self.symbol.endswith(('.X', '-USD'))
         
         # Cache for storing fetched data to avoid redundant API calls
+        # (time.monotonic() of the fetch, real-time data)
         self._real_time_data_cache = None
-        self._historical_data_cache = None
-        self._predictive_data_cache = None
+        # days -> (time.monotonic() of the fetch, historical data)
+        self._historical_data_cache = {}
+        # (days, historical tail signature) -> predictions
+        self._predictive_data_cache = {}
+        # (days, last historical date, historical tail signature) -> (predictions, combined frame)
+        self._combined_cache = {}
+        # (historical frame, HistStats computed from it)
+        self._hist_stats_cache = None
+    
+    @cached_property
+    def data_fetcher(self):
+        """DataFetcher of the analyzer, created on first use."""
+        return DataFetcher()
+    
+    @cached_property
+    def predictive_model(self):
+        """PredictiveModel of the analyzer, created on first use."""
+        return PredictiveModel()
+    
+    @classmethod
+    def from_frame(cls, symbol, historical_data, days=30):
+        """
+        Create a StockAnalyzer from already fetched historical data.
+        
+        Args:
+            symbol (str): The stock symbol to analyze (e.g., 'AAPL')
+            historical_data (pandas.DataFrame): Historical OHLC data for the symbol
+            days (int): Number of days of historical data the frame covers
+            
+        Returns:
+            StockAnalyzer: Analyzer whose historical data cache is pre-filled
+        """
+        analyzer = cls(symbol)
+        analyzer._historical_data_cache[days] = (time.monotonic(), _with_datetime_index(historical_data))
+        return analyzer
     
     def get_real_time_data(self):
         """
         Get real-time data for the stock.
         
+        The quote is reused for _REAL_TIME_TTL seconds after it was received. After that
+        it is requested from the DataFetcher again, whose shared quote cache may still
+        answer with a quote up to _REAL_TIME_TTL seconds old.
+        
+        Returns:
+            Quote: Real-time stock data including price, change, and previous close,
+            or None if it could not be fetched
+        """
+        if self._real_time_expired(time.monotonic()):
+            real_time_data = self.data_fetcher.fetch_real_time_data(self.symbol)
+            # Timestamp the quote when it arrives, like Streamlit does, so it expires no earlier
+            # than the DataFetcher cache entry it created and the next request gets a new quote
+            self._set_real_time(time.monotonic(), Quote(**real_time_data) if real_time_data else None)
+        return self._real_time_data_cache[1]
+    
+    def _real_time_expired(self, now):
+        """
+        Check whether the cached quote must be fetched again.
+        
+        Args:
+            now (float): Current time.monotonic()
+            
         Returns:
-            dict: Real-time stock data including price, change, and previous close
+            bool: True if there is no cached quote or it is older than _REAL_TIME_TTL
+        """
+        return self._real_time_data_cache is None or now - self._real_time_data_cache[0] >= _REAL_TIME_TTL
+    
+    def _set_real_time(self, fetched_at, real_time_data):
         """
-        if self._real_time_data_cache is None:
-            self._real_time_data_cache = self.data_fetcher.fetch_real_time_data(self.symbol)
-        return self._real_time_data_cache
+        Store a freshly fetched quote, dropping the predictions made from a different price.
+        
+        Args:
+            fetched_at (float): time.monotonic() of the fetch
+            real_time_data (Quote): Real-time stock data
+        """
+        old_data = self._real_time_data_cache[1] if self._real_time_data_cache else None
+        self._real_time_data_cache = (fetched_at, real_time_data)
+        
+        # Predictions start from the current price: keep them while it moved less than 0.01%
+        if old_data and real_time_data:
+            old_price = old_data.price
+            if old_price and abs(real_time_data.price - old_price) / old_price < 1e-4:
+                return
+        self._predictive_data_cache = {}
+        self._combined_cache = {}
     
     def get_historical_data(self, days=30):
         """
         Get historical OHLC data for the specified number of days.
         
+        The data is cached per number of days for _HISTORICAL_TTL seconds.
+        
         Args:
             days (int): Number of days of historical data to retrieve
             
         Returns:
             pandas.DataFrame: DataFrame with historical OHLC data
         """
-        if self._historical_data_cache is None:
-            self._historical_data_cache = self.data_fetcher.fetch_historical_data(self.symbol, days)
-        return self._historical_data_cache
+        now = time.monotonic()
+        cached = self._historical_data_cache.get(days)
+        if cached is None or now - cached[0] >= _HISTORICAL_TTL:
+            cached = (now, _with_datetime_index(self.data_fetcher.fetch_historical_data(self.symbol, days)))
+            self._historical_data_cache[days] = cached
+        return cached[1]
+    
+    def get_hist_stats(self):
+        """
+        Get the statistics of the historical data shared by predictions and trend analysis.
+        
+        Returns:
+            HistStats: Statistics of the current historical data, or None if there is none
+        """
+        historical_data = self.get_historical_data()
+        if historical_data is None or historical_data.empty:
+            return None
+        
+        # Recompute only when the historical frame itself changed
+        if self._hist_stats_cache is None or self._hist_stats_cache[0] is not historical_data:
+            self._hist_stats_cache = (historical_data, HistStats.from_frame(historical_data))
+        return self._hist_stats_cache[1]
     
     def get_news(self, limit=5):
         """
@@ -75,31 +225,42 @@ class StockAnalyzer:
         Returns:
             dict: Dictionary containing predicted prices and percentage changes
         """
-        # We'll regenerate predictions if:
-        # 1. The cache is None, or
-        # 2. The requested days is different from previous request
-        regenerate = (self._predictive_data_cache is None or 
-                     (self._predictive_data_cache is not None and 
-                      'prices' in self._predictive_data_cache and 
-                      len(self._predictive_data_cache['prices']) != days))
-        
-        if regenerate:
-            # Get historical data to base predictions on
+        if self._real_time_expired(time.monotonic()):
+            # Fetch the current quote in the background while the historical data loads;
+            # the worker gets the caller's script context for the cached fetchers
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+                real_time_future = executor.submit(self.get_real_time_data)
+                historical_data = self.get_historical_data()
+                
+                # Wait for the quote first: a moved price invalidates the cached predictions
+                real_time_data = real_time_future.result()
+        else:
+            # The cached quote is still fresh: no fetch to overlap
+            real_time_data = self.get_real_time_data()
             historical_data = self.get_historical_data()
+        
+        if historical_data is None or historical_data.empty:
+            return None
+        
+        # Predictions are cached per number of days and historical tail, so they
+        # regenerate when a new bar closes but not when the caller alternates horizons
+        cache_key = (days, _history_signature(historical_data))
+        predictive_data = self._predictive_data_cache.get(cache_key)
+        if predictive_data is None:
+            # Get current price from real-time data
+            current_price = real_time_data.price
             
-            if historical_data is not None and not historical_data.empty:
-                # Get current price from real-time data
-                real_time_data = self.get_real_time_data()
-                current_price = real_time_data['price']
-                
-                # Generate predictions
-                self._predictive_data_cache = self.predictive_model.generate_predictions(
-                    historical_data,
-                    current_price,
-                    days
-                )
+            # Generate predictions
+            predictive_data = self.predictive_model.generate_predictions(
+                historical_data,
+                current_price,
+                days,
+                stats=self.get_hist_stats()
+            )
+            self._predictive_data_cache[cache_key] = predictive_data
         
-        return self._predictive_data_cache
+        return predictive_data
     
     def get_trend_analysis(self, days=5):
         """
@@ -114,7 +275,21 @@ class StockAnalyzer:
         historical_data = self.get_historical_data()
         predictive_data = self.get_predictive_data(days=days)
         
-        return self.predictive_model.analyze_trend(historical_data, predictive_data)
+        return self.predictive_model.analyze_trend(historical_data, predictive_data, stats=self.get_hist_stats())
+    
+    def _prediction_dates(self, last_date, periods):
+        """
+        Dates of the predicted data points following the given date.
+        
+        Args:
+            last_date (pandas.Timestamp): Last date before the predictions
+            periods (int): Number of predicted data points
+            
+        Returns:
+            pandas.DatetimeIndex: Following business days for stocks, following calendar days for crypto
+        """
+        freq = 'D' if self._is_24_7 else 'B'
+        return pd.date_range(start=last_date + pd.Timedelta(days=1), periods=periods, freq=freq)
     
     def combine_historical_and_predictive(self, days=5):
         """
@@ -126,75 +301,54 @@ class StockAnalyzer:
         Returns:
             pandas.DataFrame: Combined historical and predictive data
         """
-        # Get historical data
-        historical_df = self.get_historical_data().copy()
-        historical_df['type'] = 'historical'
-        
-        # Get predictive data with the specified number of days
+        # Get predictive data with the specified number of days first: this refreshes
+        # the quote and drops the cached frames built from outdated predictions
         predictive_data = self.get_predictive_data(days=days)
         
-        # Create a DataFrame for predictive data
-        # Handle the case when historical_df might be empty or None
-        if historical_df is None or len(historical_df) == 0:
-            # If we don't have historical data, use current date as reference
-            start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Create a list of dates for the predictive data points, skipping weekends for stock market
-            dates = []
-            
-            # We should only have trading days (Mon-Fri) for stocks
-            # For crypto and other assets that trade on weekends, this could be adjusted
-            current_date = start_date
-            days_added = 0
-            
-            while days_added < len(predictive_data['prices']):
-                current_date = current_date + timedelta(days=1)
-                # Skip weekends (5 = Saturday, 6 = Sunday)
-                if self.symbol.endswith('.X') or self.symbol.endswith('-USD'):
-                    # For crypto and certain assets, include all days
-                    dates.append(current_date)
-                    days_added += 1
-                elif current_date.weekday() < 5:  # Monday to Friday
-                    # For stocks, only include weekdays
-                    dates.append(current_date)
-                    days_added += 1
+        # Get historical data (left untouched: the combined frame is built from its arrays)
+        historical_df = self.get_historical_data()
+        
+        # Reuse the combined frame while the history and the predictions are unchanged
+        if len(historical_df):
+            cache_key = (days, historical_df.index[-1], _history_signature(historical_df))
         else:
-            # Get the last date from historical data
-            last_date = historical_df.index[-1]
-            
-            # Convert pandas Timestamp to Python datetime to avoid arithmetic issues
-            if isinstance(last_date, pd.Timestamp):
-                last_date = last_date.to_pydatetime()
-            
-            # Create a list of dates for the predictive data points, skipping weekends for stock market
-            dates = []
-            
-            # We should only have trading days (Mon-Fri) for stocks
-            # For crypto and other assets that trade on weekends, this could be adjusted
-            current_date = last_date
-            days_added = 0
-            
-            while days_added < len(predictive_data['prices']):
-                current_date = current_date + timedelta(days=1)
-                # Skip weekends (5 = Saturday, 6 = Sunday)
-                if self.symbol.endswith('.X') or self.symbol.endswith('-USD'):
-                    # For crypto and certain assets, include all days
-                    dates.append(current_date)
-                    days_added += 1
-                elif current_date.weekday() < 5:  # Monday to Friday
-                    # For stocks, only include weekdays
-                    dates.append(current_date)
-                    days_added += 1
-        
-        predictive_df = pd.DataFrame({
-            'open': predictive_data['open_prices'],
-            'high': predictive_data['high_prices'],
-            'low': predictive_data['low_prices'],
-            'close': predictive_data['prices'],
-            'type': ['predictive'] * len(predictive_data['prices'])
-        }, index=dates)
-        
-        # Combine the DataFrames
-        combined_df = pd.concat([historical_df, predictive_df])
+            cache_key = (days, None, None)
+        cached = self._combined_cache.get(cache_key)
+        if cached is not None and cached[0] is predictive_data:
+            return cached[1]
+        
+        # Predictions follow the last historical date, or today when there is no history
+        start_date = historical_df.index[-1] if len(historical_df) else pd.Timestamp.now().normalize()
+        dates = self._prediction_dates(start_date, len(predictive_data['prices']))
+        
+        # Stack the predicted prices into a single (n, 4) block
+        predictive_values = np.column_stack((
+            predictive_data['open_prices'],
+            predictive_data['high_prices'],
+            predictive_data['low_prices'],
+            predictive_data['prices']
+        )).astype(_PRICE_DTYPE)
+        
+        # Combine the two price blocks directly instead of going through pd.concat
+        n_historical = len(historical_df)
+        if n_historical:
+            price_values = np.vstack((historical_df[_PRICE_COLUMNS].to_numpy(dtype=_PRICE_DTYPE), predictive_values))
+            index = historical_df.index.append(dates)
+        else:
+            price_values = predictive_values
+            index = dates
+        combined_df = pd.DataFrame(price_values, index=index, columns=_PRICE_COLUMNS)
+        
+        # Volume is only known for the historical rows
+        if 'volume' in historical_df:
+            combined_df['volume'] = np.concatenate((
+                historical_df['volume'].to_numpy(dtype=np.float64),
+                np.full(len(dates), np.nan)
+            ))
+        
+        # Label the rows of each part
+        type_codes = np.concatenate((np.zeros(n_historical, dtype=np.int8), np.ones(len(dates), dtype=np.int8)))
+        combined_df['type'] = pd.Categorical.from_codes(type_codes, dtype=_TYPE_DTYPE)
         
+        self._combined_cache[cache_key] = (predictive_data, combined_df)
         return combined_df